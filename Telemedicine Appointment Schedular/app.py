@@ -12,11 +12,12 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import json
-import uuid
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, OperationFailure
+import re
+from pymongo import MongoClient, WriteConcern
+from pymongo.errors import ServerSelectionTimeoutError, OperationFailure, DuplicateKeyError
 import time
 from functools import lru_cache
+from string import Template
 
 # Load environment variables
 load_dotenv()
@@ -25,38 +26,46 @@ load_dotenv()
 MONGODB_URI = os.getenv('MONGODB_URI')
 MONGODB_DB = os.getenv('MONGODB_DB')
 
+# Daily appointment hours (24h clock) and the display format for slots.
+# Slots are stored in MongoDB as real datetimes, so the 7-day window is an
+# index range scan and each field is 8 bytes instead of a 19-byte string.
+SLOT_HOURS = (9, 10, 11, 14, 15, 16)
+SLOT_FORMAT = '%Y-%m-%d %I:%M %p'
+
+# Detect booking intent in one case-insensitive scan instead of two
+# substring searches over a lowercased copy of the message. Deliberately
+# unanchored so inflected forms like "booking" or "appointments" match,
+# exactly as the original substring checks did.
+_BOOK_RE = re.compile(r"appointment|book", re.IGNORECASE)
+
 # Cache MongoDB connection
 @st.cache_resource
 def get_mongodb_client():
-    try:
-        client = MongoClient(MONGODB_URI)
-        return client
-    except Exception as e:
-        st.error(f"Failed to initialize MongoDB client: {str(e)}")
-        return None
+    # Validate connectivity with one ping; on success the cached client
+    # skips this round trip on later reruns. Failures raise instead of
+    # returning None so a transient blip is never cached — the caller
+    # reports it and the next rerun retries the connection.
+    client = MongoClient(MONGODB_URI)
+    client.server_info()
+    return client
 
 def test_mongodb_connection():
     try:
         if not MONGODB_URI or not MONGODB_DB:
             raise ValueError("MongoDB URI or Database name is missing in .env file")
-            
-        # Initialize MongoDB client
+
+        # Initialize MongoDB client (already validated when first cached)
         client = get_mongodb_client()
-        if client is None:
-            return None, None
-            
+
         db = client[MONGODB_DB]
-        
-        # Test connection by getting server info
-        server_info = client.server_info()
-        
+
         # Show connection toast only once when the app starts
         if 'db_connection_shown' not in st.session_state:
             st.toast("Database Connected", icon="✅")
             st.session_state.db_connection_shown = True
-        
+
         return client, db
-        
+
     except Exception as e:
         if 'db_connection_shown' not in st.session_state:
             st.toast(f"Database Connection Failed: {str(e)}", icon="❌")
@@ -66,36 +75,83 @@ def test_mongodb_connection():
 # Initialize MongoDB connection
 mongo_client, db = test_mongodb_connection()
 
+# One-time migration: convert legacy string appointment_slot values
+# (e.g. "2024-10-15 09:00 AM") to BSON Dates so they keep matching the
+# datetime-based availability query and the unique slot index. Failures
+# raise so st.cache_resource doesn't record an incomplete migration.
+@st.cache_resource
+def migrate_legacy_slot_strings():
+    for doc in db.appointments.find(
+        {"appointment_slot": {"$type": "string"}},
+        {"appointment_slot": 1}
+    ):
+        db.appointments.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"appointment_slot": datetime.strptime(doc["appointment_slot"], SLOT_FORMAT)}}
+        )
+
+# Create indexes once per process so the booked-slot query is covered.
+# Failures raise so st.cache_resource only records a run that actually
+# built the indexes; a later rerun retries after a reconnect.
+@st.cache_resource
+def ensure_appointment_indexes():
+    db.appointments.create_index([("status", 1), ("appointment_slot", 1)])
+    # Unique partial index limited to confirmed appointments: keeps
+    # the index small, lets the booked-slot query run index-only,
+    # and makes double-booking a slot impossible at the server
+    db.appointments.create_index(
+        [("appointment_slot", 1)],
+        unique=True,
+        partialFilterExpression={"status": "confirmed"},
+        name="slot_confirmed_unique"
+    )
+
+if db is not None:
+    try:
+        # Migrate before creating indexes: the unique slot index must not
+        # be built over a mix of string and Date keys
+        migrate_legacy_slot_strings()
+        ensure_appointment_indexes()
+    except Exception as e:
+        st.warning(f"Could not prepare the appointments collection: {str(e)}")
+
+# Candidate slots for the 7 days starting at day_ordinal, as datetimes to
+# match the BSON Dates stored in the collection. Keyed on the ordinal so
+# the cache rolls over at midnight and repeat calls within a day are free.
+@lru_cache(maxsize=1)
+def build_candidate_slots(day_ordinal):
+    first_day = datetime.fromordinal(day_ordinal)
+    return tuple(
+        datetime(day.year, day.month, day.day, hour)
+        for day in (first_day + timedelta(days=i) for i in range(7))
+        for hour in SLOT_HOURS
+    )
+
 # Cache available slots for 5 minutes
 @st.cache_data(ttl=300)
 def get_available_slots():
     try:
         if mongo_client is None or db is None:
             return generate_static_slots()
-            
-        # Get all booked slots from database
-        booked_slots = list(db.appointments.find(
-            {"status": "confirmed"},
-            {"appointment_slot": 1, "_id": 0}
-        ))
-        
-        booked_slot_times = [slot['appointment_slot'] for slot in booked_slots]
-        
-        # Generate available slots for the next 7 days
-        slots = []
-        for i in range(7):
-            date = (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d')
-            possible_slots = [
-                f"{date} 09:00 AM",
-                f"{date} 10:00 AM",
-                f"{date} 11:00 AM",
-                f"{date} 02:00 PM",
-                f"{date} 03:00 PM",
-                f"{date} 04:00 PM"
-            ]
-            # Only add slots that aren't booked
-            available_slots = [slot for slot in possible_slots if slot not in booked_slot_times]
-            slots.extend(available_slots)
+
+        candidates = build_candidate_slots(datetime.now().toordinal())
+
+        # Ask only which candidates are booked: with the partial index this
+        # is one index scan over at most 42 entries, so the payload stays
+        # bounded no matter how many historical bookings exist
+        booked = frozenset(
+            doc["appointment_slot"]
+            for doc in db.appointments.find(
+                {"status": "confirmed", "appointment_slot": {"$in": list(candidates)}},
+                {"_id": 0, "appointment_slot": 1}
+            )
+        )
+
+        slots = [
+            slot.strftime(SLOT_FORMAT)
+            for slot in candidates
+            if slot not in booked
+        ]
         
         if not slots:
             st.warning("No available slots found for the next 7 days")
@@ -107,19 +163,22 @@ def get_available_slots():
         st.error(f"Error fetching available slots: {str(e)}")
         return generate_static_slots()
 
+# Cache the appointment count so the sidebar doesn't hit MongoDB on every rerun
+@st.cache_data(ttl=60)
+def get_appointment_count():
+    try:
+        if mongo_client is None or db is None:
+            return 0
+        # estimated_document_count reads collection metadata instead of scanning
+        return db.appointments.estimated_document_count()
+    except Exception:
+        return 0
+
 def generate_static_slots():
-    slots = []
-    for i in range(7):
-        date = (datetime.now() + timedelta(days=i)).strftime('%Y-%m-%d')
-        slots.extend([
-            f"{date} 09:00 AM",
-            f"{date} 10:00 AM",
-            f"{date} 11:00 AM",
-            f"{date} 02:00 PM",
-            f"{date} 03:00 PM",
-            f"{date} 04:00 PM"
-        ])
-    return slots
+    return [
+        slot.strftime(SLOT_FORMAT)
+        for slot in build_candidate_slots(datetime.now().toordinal())
+    ]
 
 def save_appointment_to_db(appointment_details):
     try:
@@ -127,13 +186,11 @@ def save_appointment_to_db(appointment_details):
             raise ValueError("Database connection not established")
             
         with st.spinner('Saving your appointment...'):
-            # Generate a unique booking ID
-            booking_id = str(uuid.uuid4())
             current_time = datetime.now()
-            
-            # Prepare appointment data with data validation
+
+            # Prepare appointment data with data validation; the server-assigned
+            # ObjectId doubles as the booking ID
             appointment_data = {
-                'booking_id': booking_id,
                 'name': str(appointment_details['name']).strip(),
                 'age': int(appointment_details['age']),
                 'gender': str(appointment_details['gender']).strip(),
@@ -141,20 +198,32 @@ def save_appointment_to_db(appointment_details):
                 'email': str(appointment_details['email']).strip().lower(),
                 'doctor': str(appointment_details['doctor']),
                 'doctor_specialization': str(appointment_details['doctor_specialization']),
-                'appointment_slot': str(appointment_details['slot']),
+                'appointment_slot': datetime.strptime(str(appointment_details['slot']), SLOT_FORMAT),
                 'symptoms': str(appointment_details['symptoms']).strip(),
                 'status': 'confirmed',
                 'created_at': current_time,
                 'updated_at': current_time
             }
             
-            # Insert into MongoDB with timeout
-            result = db.appointments.insert_one(appointment_data)
+            # Insert with w=1 so the write returns after the primary
+            # acknowledges, without waiting for replica acknowledgement.
+            # The unique partial index rejects a second confirmed booking
+            # for the same slot, so a lost race surfaces here atomically.
+            appointments = db.appointments.with_options(
+                write_concern=WriteConcern(w=1, j=False)
+            )
+            try:
+                result = appointments.insert_one(appointment_data)
+            except DuplicateKeyError:
+                get_available_slots.clear()
+                st.error("Sorry, that slot was just booked by someone else. Please pick another slot.")
+                return None
             
             if result.inserted_id:
-                # Clear the slots cache to refresh available slots
+                # Clear the cached slots and count so they reflect the new booking
                 get_available_slots.clear()
-                return booking_id
+                get_appointment_count.clear()
+                return str(result.inserted_id)
             else:
                 st.error("Failed to save appointment to database")
                 return None
@@ -163,42 +232,82 @@ def save_appointment_to_db(appointment_details):
         st.error(f"Error saving appointment: {str(e)}")
         return None
 
-@st.cache_data(ttl=3600)  # Cache doctor info for 1 hour
-def get_doctors_info():
-    return {
-        "Dr. John Smith": {
-            "specialization": "General Physician",
-            "experience": "15+ years",
-            "fee": "$100",
-            "availability": "Mon-Fri",
-            "education": "MD, Internal Medicine",
-            "image": "🧑‍⚕️"  # You can replace with actual image URLs
-        },
-        "Dr. Sarah Johnson": {
-            "specialization": "Cardiologist",
-            "experience": "12+ years",
-            "fee": "$150",
-            "availability": "Mon-Wed",
-            "education": "MD, Cardiology",
-            "image": "👩‍⚕️"
-        },
-        "Dr. Michael Chen": {
-            "specialization": "Pediatrician",
-            "experience": "10+ years",
-            "fee": "$120",
-            "availability": "Tue-Sat",
-            "education": "MD, Pediatrics",
-            "image": "👨‍⚕️"
-        },
-        "Dr. Emily Williams": {
-            "specialization": "Dermatologist",
-            "experience": "8+ years",
-            "fee": "$130",
-            "availability": "Wed-Fri",
-            "education": "MD, Dermatology",
-            "image": "👩‍⚕️"
-        }
+# Static doctor catalogue; a plain module-level constant avoids the
+# pickle round-trip st.cache_data would do on every access
+DOCTORS = {
+    "Dr. John Smith": {
+        "specialization": "General Physician",
+        "experience": "15+ years",
+        "fee": "$100",
+        "availability": "Mon-Fri",
+        "education": "MD, Internal Medicine",
+        "image": "🧑‍⚕️"  # You can replace with actual image URLs
+    },
+    "Dr. Sarah Johnson": {
+        "specialization": "Cardiologist",
+        "experience": "12+ years",
+        "fee": "$150",
+        "availability": "Mon-Wed",
+        "education": "MD, Cardiology",
+        "image": "👩‍⚕️"
+    },
+    "Dr. Michael Chen": {
+        "specialization": "Pediatrician",
+        "experience": "10+ years",
+        "fee": "$120",
+        "availability": "Tue-Sat",
+        "education": "MD, Pediatrics",
+        "image": "👨‍⚕️"
+    },
+    "Dr. Emily Williams": {
+        "specialization": "Dermatologist",
+        "experience": "8+ years",
+        "fee": "$130",
+        "availability": "Wed-Fri",
+        "education": "MD, Dermatology",
+        "image": "👩‍⚕️"
     }
+}
+
+# Sidebar doctor cards rendered once at module load; the sidebar then emits a
+# single st.markdown delta per rerun instead of one per doctor
+SIDEBAR_DOCTOR_HTML = "".join(f"""
+    <div class='doctor-card'>
+        <h4 style='margin:0 0 0.5rem 0; color: #4267B2;'>{doctor_name}</h4>
+        <p style='margin:0.2rem 0;'>🏥 <strong>Specialization:</strong> {details['specialization']}</p>
+        <p style='margin:0.2rem 0;'>⏳ <strong>Experience:</strong> {details['experience']}</p>
+        <p style='margin:0.2rem 0;'>💰 <strong>Fee:</strong> {details['fee']}</p>
+        <p style='margin:0.2rem 0;'>📅 <strong>Availability:</strong> {details['availability']}</p>
+        <p style='margin:0.2rem 0;'>🎓 <strong>Education:</strong> {details['education']}</p>
+    </div>
+""" for doctor_name, details in DOCTORS.items())
+
+# Doctor selection cards for the booking form, also rendered once at module
+# load since their content never changes between reruns
+DOCTOR_CARDS = {
+    doctor_name: f"""
+        <div style='text-align: center; padding: 1rem; border-radius: 10px; border: 1px solid #e0e0e0;'>
+            <h1>{details['image']}</h1>
+            <h4>{doctor_name}</h4>
+            <p>{details['specialization']}</p>
+        </div>
+    """
+    for doctor_name, details in DOCTORS.items()
+}
+
+# Booking confirmation panel with only the dynamic fields substituted per booking
+BOOKING_SUCCESS_TEMPLATE = Template("""
+    <div style='background: linear-gradient(135deg, #4CAF50, #45a049); color: white; padding: 1.5rem; border-radius: 10px; margin: 1rem 0; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+        <h4 style='margin:0 0 1rem 0;'>🎉 Appointment Booked Successfully!</h4>
+        <p style='margin: 0.5rem 0;'><strong>Booking ID:</strong> $booking_id</p>
+        <p style='margin: 0.5rem 0;'><strong>Name:</strong> $name</p>
+        <p style='margin: 0.5rem 0;'><strong>Doctor:</strong> $doctor</p>
+        <p style='margin: 0.5rem 0;'><strong>Specialization:</strong> $specialization</p>
+        <p style='margin: 0.5rem 0;'><strong>Time Slot:</strong> $slot</p>
+        <p style='margin: 1rem 0 0 0; font-style: italic;'>✉️ A confirmation email has been sent to $email</p>
+        <p style='margin: 0.5rem 0 0 0; font-style: italic;'>⏰ Please arrive 15 minutes before your appointment time.</p>
+    </div>
+""")
 
 def handle_appointment_booking():
     if st.session_state.appointment_stage is None:
@@ -226,19 +335,13 @@ def handle_appointment_booking():
                 email = st.text_input("Email", help="Enter your email for appointment confirmation")
                 
             # Doctor Selection with images
-            doctors = get_doctors_info()
+            doctors = DOCTORS
             doctor_cols = st.columns(len(doctors))
             selected_doctor = None
             
-            for i, (doctor_name, details) in enumerate(doctors.items()):
+            for i, doctor_name in enumerate(doctors):
                 with doctor_cols[i]:
-                    st.markdown(f"""
-                        <div style='text-align: center; padding: 1rem; border-radius: 10px; border: 1px solid #e0e0e0;'>
-                            <h1>{details['image']}</h1>
-                            <h4>{doctor_name}</h4>
-                            <p>{details['specialization']}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(DOCTOR_CARDS[doctor_name], unsafe_allow_html=True)
                     if st.button(f"Select {doctor_name.split()[1]}", key=f"doc_{i}"):
                         selected_doctor = doctor_name
 
@@ -256,6 +359,9 @@ def handle_appointment_booking():
             with col2:
                 if st.button("Book Appointment", type="primary", use_container_width=True):
                     if name and age and gender != "Select" and phone and email and preferred_slot and symptoms and selected_doctor:
+                        # Look up the specialization once for the save and
+                        # the confirmation message
+                        specialization = doctors[selected_doctor]["specialization"]
                         with st.spinner("Processing your appointment..."):
                             appointment_details = {
                                 "name": name,
@@ -264,7 +370,7 @@ def handle_appointment_booking():
                                 "phone": phone,
                                 "email": email,
                                 "doctor": selected_doctor,
-                                "doctor_specialization": doctors[selected_doctor]["specialization"],
+                                "doctor_specialization": specialization,
                                 "slot": preferred_slot,
                                 "symptoms": symptoms
                             }
@@ -281,18 +387,14 @@ def handle_appointment_booking():
                                 
                                 # Show success message with animation
                                 st.balloons()
-                                st.markdown(f"""
-                                    <div style='background: linear-gradient(135deg, #4CAF50, #45a049); color: white; padding: 1.5rem; border-radius: 10px; margin: 1rem 0; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-                                        <h4 style='margin:0 0 1rem 0;'>🎉 Appointment Booked Successfully!</h4>
-                                        <p style='margin: 0.5rem 0;'><strong>Booking ID:</strong> {booking_id}</p>
-                                        <p style='margin: 0.5rem 0;'><strong>Name:</strong> {name}</p>
-                                        <p style='margin: 0.5rem 0;'><strong>Doctor:</strong> {selected_doctor}</p>
-                                        <p style='margin: 0.5rem 0;'><strong>Specialization:</strong> {doctors[selected_doctor]['specialization']}</p>
-                                        <p style='margin: 0.5rem 0;'><strong>Time Slot:</strong> {preferred_slot}</p>
-                                        <p style='margin: 1rem 0 0 0; font-style: italic;'>✉️ A confirmation email has been sent to {email}</p>
-                                        <p style='margin: 0.5rem 0 0 0; font-style: italic;'>⏰ Please arrive 15 minutes before your appointment time.</p>
-                                    </div>
-                                """, unsafe_allow_html=True)
+                                st.markdown(BOOKING_SUCCESS_TEMPLATE.substitute(
+                                    booking_id=booking_id,
+                                    name=name,
+                                    doctor=selected_doctor,
+                                    specialization=specialization,
+                                    slot=preferred_slot,
+                                    email=email
+                                ), unsafe_allow_html=True)
                                 
                                 # Reset appointment stage for new bookings
                                 st.session_state.appointment_stage = None
@@ -320,8 +422,8 @@ if 'db_connection_shown' not in st.session_state:
 if 'active_button' not in st.session_state:
     st.session_state.active_button = None
 
-# Custom CSS
-st.markdown("""
+# Custom CSS, defined once at module load
+_CSS = """
     <style>
     /* Main Layout */
     .main {
@@ -484,7 +586,11 @@ st.markdown("""
         box-shadow: 0 4px 6px rgba(0,0,0,0.1);
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+# Streamlit drops elements that aren't re-emitted on a rerun, so the
+# stylesheet must be sent every run to stay in the DOM
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # Sidebar with Doctors' Information
 with st.sidebar:
@@ -496,7 +602,7 @@ with st.sidebar:
     
     # Total Appointments Counter
     if mongo_client is not None and db is not None:
-        appointments_count = db.appointments.count_documents({})
+        appointments_count = get_appointment_count()
         st.markdown(f"""
             <div style='background: white; padding: 1rem; border-radius: 10px; margin-bottom: 1.5rem; text-align: center; box-shadow: 0 2px 4px rgba(0,0,0,0.05);'>
                 <h4 style='margin:0; color: #4267B2;'>Total Appointments</h4>
@@ -504,20 +610,8 @@ with st.sidebar:
             </div>
         """, unsafe_allow_html=True)
     
-    # Doctors Information
-    doctors = get_doctors_info()
-    
-    for doctor_name, details in doctors.items():
-        st.markdown(f"""
-            <div class='doctor-card'>
-                <h4 style='margin:0 0 0.5rem 0; color: #4267B2;'>{doctor_name}</h4>
-                <p style='margin:0.2rem 0;'>🏥 <strong>Specialization:</strong> {details['specialization']}</p>
-                <p style='margin:0.2rem 0;'>⏳ <strong>Experience:</strong> {details['experience']}</p>
-                <p style='margin:0.2rem 0;'>💰 <strong>Fee:</strong> {details['fee']}</p>
-                <p style='margin:0.2rem 0;'>📅 <strong>Availability:</strong> {details['availability']}</p>
-                <p style='margin:0.2rem 0;'>🎓 <strong>Education:</strong> {details['education']}</p>
-            </div>
-        """, unsafe_allow_html=True)
+    # Doctors Information (precomputed, one markdown call instead of one per doctor)
+    st.markdown(SIDEBAR_DOCTOR_HTML, unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -527,10 +621,18 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# Quick action buttons with enhanced styling and toggle functionality
-col1, col2, col3 = st.columns(3)
+# Emergency contact panel is static, so build the HTML once at module load
+EMERGENCY_HTML = """
+    <div style='background: #ff4444; color: white; padding: 1.5rem; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); margin: 1rem 0;'>
+        <h4 style='margin:0 0 1rem 0;'>Emergency Contacts</h4>
+        <p style='margin:0.5rem 0;'>📞 911</p>
+        <p style='margin:0.5rem 0;'>☎️ +1-XXX-XXX-XXXX</p>
+    </div>
+"""
 
-with col1:
+# Quick action buttons; the toggles share active_button, so each click must
+# rerun the whole script to keep the three panels mutually exclusive
+def render_book_action():
     if st.button("📅 Book Appointment", key="book", 
                  type="primary" if st.session_state.active_button == "book" else "secondary"):
         if st.session_state.active_button == "book":
@@ -541,7 +643,7 @@ with col1:
             st.session_state.appointment_stage = 'collect_info'
         st.rerun()
 
-with col2:
+def render_slots_action():
     if st.button("🕒 View Available Slots", key="slots",
                  type="primary" if st.session_state.active_button == "slots" else "secondary"):
         if st.session_state.active_button == "slots":
@@ -552,18 +654,30 @@ with col2:
         if st.session_state.active_button == "slots":
             available_slots = st.session_state.available_slots[:5]
             if available_slots:
-                st.markdown("""
-                    <div style='background: white; padding: 1.5rem; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); margin: 1rem 0;'>
-                        <h4 style='margin:0 0 1rem 0; color: #4267B2;'>Available Time Slots</h4>
-                        <div style='background: #f8f9fa; padding: 1rem; border-radius: 8px;'>
-                """, unsafe_allow_html=True)
-                for slot in available_slots:
-                    st.markdown(f"<p style='margin: 0.5rem 0; color: #333;'>🕒 {slot}</p>", unsafe_allow_html=True)
-                st.markdown("</div></div>", unsafe_allow_html=True)
+                # Memoize the rendered panel on the slot tuple so repeat
+                # clicks reuse the string instead of rebuilding it
+                slots_key = tuple(available_slots)
+                cached = st.session_state.get('slots_panel_cache')
+                if cached is None or cached[0] != slots_key:
+                    slot_rows = "".join(
+                        f"<p style='margin: 0.5rem 0; color: #333;'>🕒 {slot}</p>"
+                        for slot in available_slots
+                    )
+                    panel_html = f"""
+                        <div style='background: white; padding: 1.5rem; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); margin: 1rem 0;'>
+                            <h4 style='margin:0 0 1rem 0; color: #4267B2;'>Available Time Slots</h4>
+                            <div style='background: #f8f9fa; padding: 1rem; border-radius: 8px;'>
+                                {slot_rows}
+                            </div>
+                        </div>
+                    """
+                    cached = (slots_key, panel_html)
+                    st.session_state.slots_panel_cache = cached
+                st.markdown(cached[1], unsafe_allow_html=True)
             else:
                 st.warning("No available slots found")
 
-with col3:
+def render_emergency_action():
     if st.button("🚨 Emergency Contact", key="emergency",
                  type="primary" if st.session_state.active_button == "emergency" else "secondary"):
         if st.session_state.active_button == "emergency":
@@ -572,13 +686,24 @@ with col3:
             st.session_state.active_button = "emergency"
 
         if st.session_state.active_button == "emergency":
-            st.markdown("""
-                <div style='background: #ff4444; color: white; padding: 1.5rem; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); margin: 1rem 0;'>
-                    <h4 style='margin:0 0 1rem 0;'>Emergency Contacts</h4>
-                    <p style='margin:0.5rem 0;'>📞 911</p>
-                    <p style='margin:0.5rem 0;'>☎️ +1-XXX-XXX-XXXX</p>
-                </div>
-            """, unsafe_allow_html=True)
+            st.markdown(EMERGENCY_HTML, unsafe_allow_html=True)
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    render_book_action()
+
+with col2:
+    render_slots_action()
+
+with col3:
+    render_emergency_action()
+
+# Reuse one Gemini model per process; constructing it per message repeats
+# config parsing and auth setup
+@st.cache_resource
+def get_gemini_model():
+    return genai.GenerativeModel('gemini-2.0-flash')
 
 # Chat interface
 with st.container():
@@ -614,16 +739,18 @@ with st.container():
         - Maintain patient privacy and confidentiality
         """
 
+        if _BOOK_RE.search(question):
+            return "I'll help you book an appointment. Let me guide you through the process."
+
         # Combine context with user's question
         prompt = f"{system_context}\n\nPatient's Question: {question}\n\nResponse:"
 
-        if "appointment" in question.lower() or "book" in question.lower():
-            return "I'll help you book an appointment. Let me guide you through the process."
-        
         try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            chat = model.start_chat(history=[])
-            response = chat.send_message(prompt)
+            # Keep one chat per session so multi-turn context is preserved
+            # and per-message setup cost disappears
+            if 'gemini_chat' not in st.session_state:
+                st.session_state.gemini_chat = get_gemini_model().start_chat(history=[])
+            response = st.session_state.gemini_chat.send_message(prompt)
             return response.text
         except Exception as e:
             return "I apologize, but I'm having trouble processing your request. Please try asking your question again or contact our support team for assistance."
@@ -650,7 +777,7 @@ with st.container():
         st.session_state.processing = True
         st.session_state.chat_history.append({"role": "user", "content": user_input})
         
-        if "appointment" in user_input.lower() or "book" in user_input.lower():
+        if _BOOK_RE.search(user_input):
             st.session_state.appointment_stage = None
             response = "I'll help you book an appointment. Let me guide you through the process."
             st.session_state.chat_history.append({"role": "bot", "content": response})